@@ -1,163 +1,328 @@
 import os
+import re
 import calendar
-import textwrap
+import functools
+import threading
+import shutil
+import traceback
 from datetime import datetime
+from html import escape
+from unicodedata import east_asian_width
 from io import BytesIO
 from pathlib import Path
-from urllib.request import urlretrieve
+from urllib.request import urlopen
+from concurrent.futures import Future
 
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
 import matplotlib.patches as patches
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import PatchCollection
 import matplotlib.font_manager as fm
 import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx
 
 
 # ============================================
 # 1. 自動下載中文字型（Source Han Sans TC）
 # ============================================
 
+FONT_FILE = "SourceHanSansTC-Regular.otf"
 FONT_URL = (
     "https://github.com/adobe-fonts/source-han-sans/raw/release/"
-    "OTF/TraditionalChinese/SourceHanSansTC-Regular.otf"
+    f"OTF/TraditionalChinese/{FONT_FILE}"
 )
 
+# 部署時把字型放在 assets/ 底下，冷啟動就不必再連網下載；
+# 字型檔不進版本庫（見 .gitignore），由 devcontainer 或部署流程負責放進來
+BUNDLED_FONT_PATH = Path(__file__).resolve().parent / "assets" / FONT_FILE
+
+# 下載字型的逾時秒數：連線卡住時不要讓整個頁面一直等下去
+FONT_DOWNLOAD_TIMEOUT = 20
+
+@st.cache_resource(show_spinner="正在載入中文字型…")
 def set_chinese_font():
     """
-    自動下載「思源黑體（繁體）」並設定為 matplotlib 中文字型。
-    在本機與雲端環境都能用，避免豆腐字。
+    載入「思源黑體（繁體）」並回傳指向字型檔的 FontProperties，
+    畫圖時每個 ax.text 以 fontproperties 指定，避免豆腐字。
+    優先使用 assets/ 裡隨專案附上的字型；沒有的話才自動下載到 .font_cache。
+    字型是整個程序共用的資源，用 cache_resource 確保下載與載入只做一次。
+    失敗時直接拋出例外：cache_resource 不會快取例外，下次按「產生行事曆」才會再試。
     """
-    cache_dir = Path(".font_cache")
-    cache_dir.mkdir(exist_ok=True)
-    font_path = cache_dir / "SourceHanSansTC-Regular.otf"
+    if BUNDLED_FONT_PATH.exists():
+        font_path = BUNDLED_FONT_PATH
+    else:
+        cache_dir = Path(".font_cache")
+        cache_dir.mkdir(exist_ok=True)
+        font_path = cache_dir / FONT_FILE
 
     # 若不存在 → 自動下載
     if not font_path.exists():
         try:
-            st.write("首次使用：正在下載中文字型（Source Han Sans TC），請稍候 2～3 秒…")
-        except Exception:
-            pass
-
-        try:
-            urlretrieve(FONT_URL, font_path)
+            with urlopen(FONT_URL, timeout=FONT_DOWNLOAD_TIMEOUT) as resp, open(font_path, "wb") as f:
+                shutil.copyfileobj(resp, f)
             print(f"已下載中文字型：{font_path}")
         except Exception as e:
             print("⚠️ 字型下載失敗，可能會變成豆腐字")
             print(e)
-            return None
+            # 下載到一半的檔案留著會讓之後每次都載入失敗
+            font_path.unlink(missing_ok=True)
+            raise
 
     # 載入字型
     try:
-        fm.fontManager.addfont(str(font_path))
         prop = fm.FontProperties(fname=str(font_path))
-        font_name = prop.get_name()
-
-        plt.rcParams["font.sans-serif"] = [font_name]
-        plt.rcParams["font.family"] = "sans-serif"
-        plt.rcParams["axes.unicode_minus"] = False
-
-        print(f"目前中文使用字型：{font_name}")
-        return font_name
+        print(f"目前中文使用字型：{prop.get_name()}")
+        return prop
 
     except Exception as e:
         print("⚠️ 字型載入失敗")
         print(e)
-        return None
+        raise
 
 
 # ============================================
-# 2. 資料處理：把 Excel 整理成 {day: [事件文字…]}
+# 2. 資料處理：把 Excel 整理成每天的事件清單
 # ============================================
 
-def format_time_range(raw: str) -> str:
-    """把 0900-1200 轉成 09:00-12:00。"""
-    if not isinstance(raw, str):
-        return ""
-    if "-" not in raw:
+_TIME_RE = re.compile(r"^\s*(\d{1,2})(\d{2})\s*-\s*(\d{1,2})(\d{2})\s*$")
+
+
+def format_time_column(raw: pd.Series) -> pd.Series:
+    """
+    把整個「時間」欄位的 0900-1200 轉成 09:00-12:00。
+    時段大多重複（同樣的節次），只格式化不重複的值再對應回每一列。
+    """
+    raw = raw.astype(str)
+    uniques = pd.Series(raw.unique(), dtype=raw.dtype)
+    parts = uniques.str.extract(_TIME_RE)
+    formatted = (
+        parts[0].str.zfill(2) + ":" + parts[1] + "-" + parts[2].str.zfill(2) + ":" + parts[3]
+    )
+    # 不是 HHMM-HHMM 格式的時間維持原樣
+    formatted = formatted.where(parts[0].notna(), uniques)
+    return raw.map(pd.Series(formatted.to_numpy(), index=uniques)).astype(raw.dtype)
+
+
+def _to_dates(raw: pd.Series) -> pd.Series:
+    """
+    把「日期」欄位轉成 datetime64。
+    Excel 讀進來通常已經是日期型別就直接用；文字日期先試 YYYY-MM-DD 的快速路徑，
+    不符合再交給 pandas 逐格判斷格式。看不懂的內容（例如表尾的備註）變成 NaT，
+    由呼叫端決定要略過還是報錯。
+    """
+    if pd.api.types.is_datetime64_any_dtype(raw):
         return raw
-    start, end = raw.split("-")
-    start = start.zfill(4)
-    end = end.zfill(4)
-    return f"{start[:2]}:{start[2:]}-{end[:2]}:{end[2:]}"
+    try:
+        return pd.to_datetime(raw, format="%Y-%m-%d", cache=True)
+    except (TypeError, ValueError):
+        return pd.to_datetime(raw, format="mixed", errors="coerce", cache=True)
 
 
-def build_events_dict(df: pd.DataFrame):
+def _text_column(df: pd.DataFrame, name: str) -> pd.Series:
+    """取出文字欄位：空值變成空字串並去除前後空白；欄位不存在時整欄都是空字串。"""
+    if name not in df:
+        return pd.Series("", index=df.index)
+    col = df[name]
+    return col.where(col.notna(), "").astype(str).str.strip()
+
+
+def build_events(df: pd.DataFrame) -> pd.DataFrame:
     """
     將每一列轉成「某一天的某一個活動」：
     - 時間
     - 上課 / 借用 / 參訪 標籤
     - 申請事由 + 申請單位（都會顯示）
-    回傳: {1: ["09:00-12:00 (借用) OO課程｜OO單位", ...], ...}
+    回傳兩欄的 DataFrame：day（int16）、event_line（"09:00-12:00 (借用) OO課程｜OO單位"）。
+
+    全部以整欄運算完成，不逐列 iterrows。
     """
-    df[["日期", "星期", "地點"]] = df[["日期", "星期", "地點"]].ffill()
-
-    df = df[df["時間"].notna()]
-    df = df[df["日期"].notna()]
-    df["日期"] = pd.to_datetime(df["日期"])
-
-    events_by_day = {}
-
-    for _, row in df.iterrows():
-        day = int(row["日期"].day)
-        time_str = format_time_range(str(row["時間"]))
-
-        # 標籤
-        tags = []
-        if str(row.get("上課")) == "V":
-            tags.append("上課")
-        if str(row.get("借用")) == "V":
-            tags.append("借用")
-        if str(row.get("參訪")) == "V":
-            tags.append("參訪")
-        tag_text = f"({'、'.join(tags)})" if tags else ""
-
-        # 申請事由 + 申請單位
-        reason_raw = row.get("申請事由")
-        unit_raw = row.get("申請單位")
-
-        reason = "" if pd.isna(reason_raw) else str(reason_raw).strip()
-        unit = "" if pd.isna(unit_raw) else str(unit_raw).strip()
-
-        # 兩者組合：希望單位一定出現
-        if reason and unit:
-            desc = f"{reason}｜{unit}"
-        elif reason:
-            desc = reason
-        elif unit:
-            desc = unit
-        else:
-            # 完全沒內容就略過
-            continue
+    # 合併儲存格只有第一列有值，往下補齊；用 assign 產生新表，不改到呼叫端的 df
+    # 先轉成日期 / 字串型別再補齊，ffill 才會走有型別的快速路徑，不經過 object
+    raw_dates = df["日期"]
+    dates = _to_dates(raw_dates)
+    # 轉不成日期的格子（例如「備註：…」）連同它往下合併的列都不算日期，
+    # 不能讓 ffill 把上一個日期補進來
+    unparsed = (raw_dates.notna() & dates.isna()).where(raw_dates.notna()).ffill()
+    unparsed = unparsed.fillna(False).astype(bool)
+    bad = unparsed & df["時間"].notna()
+    if bad.any():
+        # 有時間卻沒有看得懂的日期，是真的填錯了，直接報錯
+        raise ValueError(f"無法辨識的日期：{raw_dates.ffill()[bad].iloc[0]!r}")
+    df = df.assign(
+        **{
+            "日期": dates.ffill().mask(unparsed),
+            "星期": df["星期"].astype("string").ffill(),
+            "地點": df["地點"].astype("string").ffill(),
+        }
+    )
 
-        if not time_str:
-            continue
+    # 一次算好遮罩再篩選，只產生一份篩選後的資料
+    df = df.loc[df["時間"].notna() & df["日期"].notna()]
+
+    days = df["日期"].dt.day.to_numpy(dtype=np.int16)
+    time_str = format_time_column(df["時間"])
+
+    # 標籤：上課、借用、參訪 以「、」串起來，外面加括號
+    # 「V」直接整欄比對成布林遮罩，不必每格轉成字串
+    tag_joined = pd.Series("", index=df.index)
+    for tag in ("上課", "借用", "參訪"):
+        if tag in df:
+            marked = df[tag].eq("V").to_numpy()
+            tag_joined = tag_joined + np.where(marked, tag + "、", "")
+    tag_joined = tag_joined.str.rstrip("、")
+    tag_text = ("(" + tag_joined + ")").where(tag_joined != "", "")
+
+    # 申請事由 + 申請單位：希望單位一定出現
+    reason = _text_column(df, "申請事由")
+    unit = _text_column(df, "申請單位")
+    both = (reason != "") & (unit != "")
+    desc = (reason + "｜" + unit).where(both, reason + unit)
+
+    # 完全沒內容、或沒有時間就略過
+    keep = ((desc != "") & (time_str != "")).to_numpy()
+
+    # 一行文字：時間 + 標籤 + 事由/單位；沒有標籤時留下的多餘空白一併收掉
+    event_line = (
+        time_str.str.cat([tag_text, desc], sep=" ")
+        .str.replace(r"\s+", " ", regex=True)
+        .str.strip()
+    )
+
+    return pd.DataFrame(
+        {"day": days[keep], "event_line": event_line.to_numpy()[keep]}
+    )
+
+
+def group_events_by_day(events: pd.DataFrame):
+    """把 build_events 的結果整理成 {day: [事件文字…]}，給畫格子時逐格查詢。"""
+    grouped = events.groupby("day")["event_line"].agg(list)
+    return {int(day): lines for day, lines in grouped.items()}
 
-        # 一行文字：時間 + 標籤 + 事由/單位
-        event_line = f"{time_str} {tag_text} {desc}".strip()
-        events_by_day.setdefault(day, []).append(event_line)
 
-    return events_by_day
+# 控管表裡實際會用到的欄位；其他欄位讀檔時直接略過
+EXCEL_COLUMNS = ("日期", "星期", "時間", "地點", "上課", "借用", "參訪", "申請事由", "申請單位")
+
+
+def _parse_sheet(xls: pd.ExcelFile, sheet: str) -> pd.DataFrame:
+    """讀取單一月份工作表：第 2 列是標題列，只取 EXCEL_COLUMNS 裡的欄位。"""
+    try:
+        return xls.parse(sheet, header=1, usecols=lambda col: col in EXCEL_COLUMNS)
+    except ValueError:
+        # 空白或只有一列的工作表（例如說明頁）沒有標題列，不影響其他月份；
+        # 其他解析錯誤照常拋出，不要悄悄變成空的月份
+        if len(xls.parse(sheet, header=None)) >= 2:
+            raise
+        return pd.DataFrame()
+
+
+@st.cache_data(show_spinner=False)
+def read_all_sheets(file_bytes: bytes):
+    """
+    一次讀完整個 Excel：回傳 {工作表名稱: DataFrame}。
+    依檔案內容快取，切換月份、按按鈕重跑時都不必再解壓縮與解析 XML；
+    上傳新檔案時內容不同，自然會重新讀取。
+    使用 calamine（Rust 實作）解析 XLSX，比純 Python 的 openpyxl 快上數倍。
+    """
+    with pd.ExcelFile(BytesIO(file_bytes), engine="calamine") as xls:
+        return {sheet: _parse_sheet(xls, sheet) for sheet in xls.sheet_names}
 
 
 # ============================================
 # 3. 漂亮版月曆繪製
 # ============================================
 
-def draw_month_calendar(year, month, events_by_day, title_text):
+# 換行用的切字規則：連續空白、連續的半形英數符號（不從中間切開）、其他單一字元
+_WRAP_TOKEN_RE = re.compile(r" +|[!-~]+|.")
+
+
+def _display_width(text: str) -> int:
+    """顯示寬度：全形字（中文、全形標點）算 2，其他算 1。"""
+    return sum(2 if east_asian_width(ch) in "WF" else 1 for ch in text)
+
+
+@functools.lru_cache(maxsize=2048)
+def wrap_cjk(text: str, width: int = 28) -> str:
+    """
+    依顯示寬度換行（textwrap 把中文字當成 1 格，寬度會算錯）。
+    優先在空白或中文字之間換行；單一英數字串比整行還寬時才硬切。
+    同樣的活動常在好幾天重複出現，用 lru_cache 省下重算。
+    """
+    lines = []
+    line, line_width = "", 0
+    for token in _WRAP_TOKEN_RE.findall(text):
+        token_width = _display_width(token)
+        if line_width + token_width > width and line.strip():
+            lines.append(line.rstrip())
+            line, line_width = "", 0
+            if token.isspace():
+                continue
+
+        # 太長的英數字串：先切成整行寬度的片段
+        while token_width > width:
+            lines.append(token[:width])
+            token = token[width:]
+            token_width = len(token)
+
+        line += token
+        line_width += token_width
+
+    lines.append(line.rstrip())
+    return "\n".join(lines)
+
+
+@st.cache_resource
+def _calendar_figure():
+    """
+    整個程序共用一個月曆 Figure，重畫時只清空內容，
+    不必每次重新配置整張 Agg 畫布。回傳 (fig, lock)，畫圖時要先拿到 lock。
+    """
+    # 直接用 Figure + Agg 畫布，不經過 pyplot 的全域圖表管理
+    fig = Figure(figsize=(24, 16))
+    FigureCanvasAgg(fig)
+    return fig, threading.Lock()
+
+
+# 下載的 PNG 解析度（畫面預覽改用 HTML，不經過 Matplotlib）
+# 24x16 吋 @ 150 dpi = 3600x2400 像素，螢幕觀看與列印都已足夠
+DOWNLOAD_DPI = 150
+
+WEEKDAYS = ["週日", "週一", "週二", "週三", "週四", "週五", "週六"]
+SUBTITLE = "時間、申請事由與申請單位一覽"
+
+
+def draw_month_calendar(year, month, events_by_day, title_text, font_prop=None, dpi=DOWNLOAD_DPI):
     """
     繪製漂亮版月曆：
     - 淺灰底色
     - 週末淡色背景
     - 上方標題、星期列底色
     - 每筆活動前面加 •，內含「時間 + 標籤 + 申請事由｜申請單位」
+
+    font_prop 是中文字型的 FontProperties；None 時用 Matplotlib 預設字型。
+    會重複使用 _calendar_figure() 的共用 Figure，畫圖期間持有它的 lock，
+    可以從任何執行緒直接呼叫。回傳 PNG 的 bytes。
     """
-    set_chinese_font()
+    fig, lock = _calendar_figure()
+    with lock:
+        return _draw_on_figure(fig, year, month, events_by_day, title_text, font_prop, dpi)
+
 
+def _draw_on_figure(fig, year, month, events_by_day, title_text, font_prop, dpi):
+    """draw_month_calendar 的本體：在已上鎖的共用 Figure 上畫圖並輸出 PNG。"""
     calendar.setfirstweekday(calendar.SUNDAY)
-    month_matrix = calendar.monthcalendar(year, month)
-    weeks = len(month_matrix)
+    month_matrix = np.array(calendar.monthcalendar(year, month), dtype=np.int16)
+    weeks = month_matrix.shape[0]
+
+    # 每一格的座標一次算好（攤平成一維）：x 是星期幾，y 往下微移，讓格子不要貼到星期列
+    day_idx, week_idx = np.meshgrid(np.arange(7), np.arange(weeks))
+    xs = day_idx.ravel()
+    ys = (weeks - week_idx - 1).ravel() - 0.1
+    days = month_matrix.ravel()
 
-    fig, ax = plt.subplots(figsize=(24, 16))
+    fig.clear()
+    ax = fig.add_subplot(111)
     fig.patch.set_facecolor("#F7F7F9")
     ax.set_facecolor("#FFFFFF")
     ax.set_xlim(0, 7)
@@ -171,120 +336,186 @@ def draw_month_calendar(year, month, events_by_day, title_text):
         title_text,
         ha="left",
         va="center",
+        fontproperties=font_prop,
         fontsize=26,
         fontweight="bold",
         transform=ax.transData,
     )
 
     # 子標題：小字說明
-    subtitle = "時間、申請事由與申請單位一覽"
     ax.text(
         0.02,
         weeks + 0.15,
-        subtitle,
+        SUBTITLE,
         ha="left",
         va="center",
+        fontproperties=font_prop,
         fontsize=14,
         color="#666666",
         transform=ax.transData,
     )
 
     # ---------- 星期列 ----------
-    weekdays = ["週日", "週一", "週二", "週三", "週四", "週五", "週六"]
     header_height = 0.5
-    for i, wd in enumerate(weekdays):
-        # 星期底色
-        rect = patches.Rectangle(
-            (i, weeks - 0.3),
-            1,
-            header_height,
-            linewidth=0,
-            facecolor="#F0F0F5",
-        )
-        ax.add_patch(rect)
-
+    # 星期底色：7 個矩形合成一個 PatchCollection 一次畫完
+    header_rects = [
+        patches.Rectangle((i, weeks - 0.3), 1, header_height) for i in range(7)
+    ]
+    ax.add_collection(
+        PatchCollection(header_rects, facecolor="#F0F0F5", linewidth=0)
+    )
+    for i, wd in enumerate(WEEKDAYS):
         ax.text(
             i + 0.5,
             weeks + header_height - 0.45,
             wd,
             ha="center",
             va="center",
+            fontproperties=font_prop,
             fontsize=16,
             fontweight="bold",
             color="#333333",
         )
 
     # ---------- 每一格（日曆） ----------
-    for week_idx, week in enumerate(month_matrix):
-        for day_idx, day in enumerate(week):
-            x = day_idx
-            y = weeks - (week_idx + 1) - 0.1  # 往下微移，讓格子不要貼到星期列
+    # 格子底色與框線：全部矩形合成一個 PatchCollection
+    cell_rects = [patches.Rectangle((x, y), 1, 1) for x, y in zip(xs, ys)]
+
+    # 平日 / 週末不同底色（週日 / 週六）
+    weekend = (days != 0) & ((xs == 0) | (xs == 6))
+    cell_colors = np.where(weekend, "#FBFBFD", "#FFFFFF").tolist()
+
+    ax.add_collection(
+        PatchCollection(
+            cell_rects,
+            facecolor=cell_colors,
+            edgecolor="#DDDDDD",
+            linewidth=0.8,
+        )
+    )
 
-            # 平日 / 週末不同底色
-            if day == 0:
-                facecolor = "#FFFFFF"
-            elif day_idx in (0, 6):
-                # 週日 / 週六
-                facecolor = "#FBFBFD"
-            else:
-                facecolor = "#FFFFFF"
-
-            rect = patches.Rectangle(
-                (x, y),
-                1,
-                1,
-                fill=True,
-                facecolor=facecolor,
-                edgecolor="#DDDDDD",
-                linewidth=0.8,
-            )
-            ax.add_patch(rect)
+    # 活動文字先整月換行好，畫格子時只剩 ax.text
+    cell_texts = {
+        day: "\n".join("• " + wrap_cjk(event) for event in events)
+        for day, events in events_by_day.items()
+    }
 
-            if day == 0:
-                continue
+    # 文字樣式在迴圈外建好一次，每格直接套用
+    day_text_style = dict(
+        ha="left",
+        va="top",
+        fontproperties=font_prop,
+        fontsize=16,
+        fontweight="bold",
+        color="#333333",
+    )
+    event_text_style = dict(
+        ha="left", va="top", fontproperties=font_prop, fontsize=14, color="#333333"
+    )
 
-            # 日期
-            ax.text(
-                x + 0.05,
-                y + 0.95,
-                str(day),
-                ha="left",
-                va="top",
-                fontsize=16,
-                fontweight="bold",
-                color="#333333",
-            )
+    # 只有真正的日期格要放文字
+    has_day = days != 0
+    cells = zip(xs[has_day].tolist(), ys[has_day].tolist(), days[has_day].tolist())
+    for x, y, day in cells:
+        # 日期
+        ax.text(x + 0.05, y + 0.95, str(day), **day_text_style)
 
-            # 活動內容
-            events = events_by_day.get(day, [])
-            if not events:
-                continue
+        # 活動內容
+        cell_text = cell_texts.get(day)
+        if not cell_text:
+            continue
 
-            wrapped_lines = []
-            for event in events:
-                # 每個活動做換行，寬度可調整
-                wrapped = textwrap.fill(event, width=17)
-                wrapped_lines.append("• " + wrapped)
-
-            cell_text = "\n".join(wrapped_lines)
-
-            ax.text(
-                x + 0.05,
-                y + 0.80,
-                cell_text,
-                ha="left",
-                va="top",
-                fontsize=14,
-                color="#333333",
-            )
+        ax.text(x + 0.05, y + 0.80, cell_text, **event_text_style)
 
-    fig.tight_layout()
+    # 邊界直接固定，不用 bbox_inches="tight"（那會讓 savefig 多畫一次來量邊界）
+    fig.subplots_adjust(left=0.01, right=0.99, top=0.99, bottom=0.01)
 
     buf = BytesIO()
-    fig.savefig(buf, dpi=300, format="png", bbox_inches="tight")
-    buf.seek(0)
-    plt.close(fig)
-    return buf
+    # zlib 壓縮等級 1：檔案稍大，但 PNG 編碼快好幾倍
+    fig.savefig(buf, dpi=dpi, format="png", pil_kwargs={"compress_level": 1})
+    png = buf.getvalue()
+    buf.close()
+
+    # 畫完就清掉圖上的文字與格子，共用的 Figure 不會一直留著上一張月曆
+    fig.clear()
+    return png
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def render_calendar_png(year, month, events, title_text, font_file=None, dpi=DOWNLOAD_DPI) -> bytes:
+    """
+    同一個月份、同樣活動內容的月曆只畫一次，之後直接回傳快取的 PNG bytes。
+    events 是 build_events 的 DataFrame，快取直接以它的內容當作 key。
+    font_file 是中文字型檔的路徑（載入失敗時為 None），也是 key 的一部分，
+    字型載入失敗時畫出的豆腐字版本不會在字型好了之後繼續被拿來用。
+    """
+    events_by_day = group_events_by_day(events)
+    font_prop = fm.FontProperties(fname=font_file) if font_file else None
+    return draw_month_calendar(year, month, events_by_day, title_text, font_prop, dpi=dpi)
+
+
+def submit_calendar_png(year, month, events, title_text, font_file=None):
+    """
+    在背景執行緒呼叫 render_calendar_png，回傳 Future。
+    產生 HTML 預覽的同時 PNG 已經在畫，不必等 PNG 畫完才看到月曆。
+    每次都開一條用完即丟的執行緒，context 不會留在重複使用的 worker 上；
+    同時畫好幾張時由共用 Figure 的 lock 排隊。
+    """
+    future = Future()
+
+    def job():
+        try:
+            future.set_result(render_calendar_png(year, month, events, title_text, font_file))
+        except Exception as e:
+            print("⚠️ 月曆 PNG 產生失敗")
+            traceback.print_exc()
+            future.set_exception(e)
+
+    thread = threading.Thread(target=job, daemon=True)
+    # 讓背景執行緒也掛上這次執行的 context，st.cache_data 才能正常運作
+    add_script_run_ctx(thread)
+    thread.start()
+    return future
+
+
+def render_calendar_html(year, month, events_by_day, title_text) -> str:
+    """
+    畫面預覽用的 HTML 月曆（樣式在頁面的 CSS 裡的 .cal-*）：
+    版面和 PNG 相同，但產生只要幾微秒，瀏覽器裡也能縮放、搜尋文字。
+    """
+    calendar.setfirstweekday(calendar.SUNDAY)
+    month_matrix = calendar.monthcalendar(year, month)
+
+    parts = [
+        f'<div class="cal-title">{escape(title_text)}</div>',
+        f'<div class="cal-subtitle">{SUBTITLE}</div>',
+        '<table class="cal"><thead><tr>',
+    ]
+    parts.extend(f"<th>{wd}</th>" for wd in WEEKDAYS)
+    parts.append("</tr></thead><tbody>")
+
+    for week in month_matrix:
+        parts.append("<tr>")
+        for day_idx, day in enumerate(week):
+            if day == 0:
+                parts.append('<td class="cal-empty"></td>')
+                continue
+
+            # 週日 / 週六
+            parts.append('<td class="cal-weekend">' if day_idx in (0, 6) else "<td>")
+            parts.append(f'<div class="cal-day">{day}</div>')
+
+            events = events_by_day.get(day, [])
+            if events:
+                parts.append('<ul class="cal-events">')
+                parts.extend(f"<li>{escape(event)}</li>" for event in events)
+                parts.append("</ul>")
+            parts.append("</td>")
+        parts.append("</tr>")
+
+    parts.append("</tbody></table>")
+    # 不換行輸出，避免 markdown 把縮排當成程式碼區塊
+    return "".join(parts)
 
 
 # ============================================
@@ -307,6 +538,48 @@ st.markdown(
         color: #888888;
         margin-bottom: 1.2rem;
     }
+    .cal-title {
+        font-size: 1.6rem;
+        font-weight: 700;
+    }
+    .cal-subtitle {
+        font-size: 0.9rem;
+        color: #666666;
+        margin-bottom: 0.6rem;
+    }
+    table.cal {
+        width: 100%;
+        table-layout: fixed;
+        border-collapse: collapse;
+        background: #FFFFFF;
+        color: #333333;
+    }
+    table.cal th {
+        background: #F0F0F5;
+        font-weight: 700;
+        text-align: center;
+        padding: 0.3rem;
+        border: none;
+    }
+    table.cal td {
+        vertical-align: top;
+        height: 8rem;
+        padding: 0.3rem;
+        border: 1px solid #DDDDDD;
+        background: #FFFFFF;
+    }
+    table.cal td.cal-weekend {
+        background: #FBFBFD;
+    }
+    .cal-day {
+        font-size: 1.1rem;
+        font-weight: 700;
+    }
+    .cal-events {
+        margin: 0.2rem 0 0 0;
+        padding-left: 1rem;
+        font-size: 0.85rem;
+    }
     </style>
     """,
     unsafe_allow_html=True,
@@ -325,11 +598,10 @@ with st.sidebar:
     uploaded_file = st.file_uploader("請上傳 Excel 檔（.xlsx）", type=["xlsx"])
 
     sheet_names = []
-    xls = None
     if uploaded_file is not None:
         try:
-            xls = pd.ExcelFile(uploaded_file)
-            sheet_names = xls.sheet_names
+            sheets = read_all_sheets(uploaded_file.getvalue())
+            sheet_names = list(sheets)
             st.success(f"成功讀取，共有 {len(sheet_names)} 個月份表。")
         except Exception as e:
             st.error(f"讀取 Excel 失敗：{e}")
@@ -349,7 +621,7 @@ elif not target_sheet:
     st.info("請在左側選擇要產生的月份工作表。")
 elif generate_btn:
     try:
-        df = pd.read_excel(uploaded_file, sheet_name=target_sheet, header=1)
+        df = sheets[target_sheet]
 
         # 推出年份與月份
         tmp = df[df["日期"].notna()].copy()
@@ -360,21 +632,37 @@ elif generate_btn:
             year = first_date.year
             month = first_date.month
 
-            events = build_events_dict(df)
+            events = build_events(df)
             title = f"{year}年{month:02d}月 多功能教室使用情形"
 
-            png_buf = draw_month_calendar(year, month, events, title)
+            # 中文字型到真的要畫 PNG 時才載入，載入成功後整個程序沿用；
+            # 失敗時這次先用預設字型，下次按「產生行事曆」會再試一次
+            try:
+                font_file = set_chinese_font().get_file()
+            except Exception:
+                font_file = None
 
-            st.success(f"已產生 {year} 年 {month} 月的使用情形月曆。")
-            st.image(png_buf, use_container_width=True)
+            # PNG 先丟到背景開始畫，不擋住下面的預覽
+            png_future = submit_calendar_png(year, month, events, title, font_file)
 
-            st.download_button(
-                label="下載這個月曆 PNG 檔",
-                data=png_buf,
-                file_name=f"calendar_{target_sheet}.png",
-                mime="image/png",
+            st.success(f"已產生 {year} 年 {month} 月的使用情形月曆。")
+            st.markdown(
+                render_calendar_html(year, month, group_events_by_day(events), title),
+                unsafe_allow_html=True,
             )
 
+            # 預覽已經送出，這裡才等背景的 PNG 畫完；畫失敗就不顯示下載按鈕
+            png_error = png_future.exception()
+            if png_error is not None:
+                st.error(f"產生 PNG 檔時發生錯誤：{png_error}")
+            else:
+                st.download_button(
+                    label="下載這個月曆 PNG 檔",
+                    data=png_future.result(),
+                    file_name=f"calendar_{target_sheet}.png",
+                    mime="image/png",
+                )
+
     except Exception as e:
         st.error(f"產生行事曆時發生錯誤：{e}")
 else: